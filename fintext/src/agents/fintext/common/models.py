@@ -0,0 +1,6 @@
+from google.adk.models import Gemini
+
+# A model name is resolved to a separate Gemini instance per agent, each with its own genai
+# client and HTTP connection pool. Agents given this one instance share a client, so
+# concurrent sub-agent calls reuse its keep-alive connections instead of opening new ones.
+GEMINI_FLASH = Gemini(model="gemini-2.5-flash")
@@ -0,0 +1,34 @@
+import json
+
+try:
+    import orjson
+
+    def dumps(obj, indent=True) -> str:
+        """Serializes obj to a JSON string, indented by 2 spaces unless indent is False."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+except ImportError:
+    def dumps(obj, indent=True) -> str:
+        """Serializes obj to a JSON string, indented by 2 spaces unless indent is False."""
+        if indent:
+            return json.dumps(obj, indent=2)
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+_CSV_SPECIAL = frozenset(',"\r\n')
+
+def csv_field(value) -> str:
+    """Formats a free-text CSV field, quoting it like csv.writer does when it holds a delimiter, quote or newline."""
+    if value is None:
+        return ""
+    value = str(value)
+    if _CSV_SPECIAL.isdisjoint(value):
+        return value
+    return '"' + value.replace('"', '""') + '"'
+
+def extract_amount(value) -> float:
+    """Returns the amount of a market data entry (price or NAV): a number, a numeric string, or a dict with 'amount'. Anything else is 0.0."""
+    if isinstance(value, dict):
+        return value.get('amount', 0.0)
+    try:
+        return float(value) if value is not None else 0.0
+    except (ValueError, TypeError):
+        return 0.0
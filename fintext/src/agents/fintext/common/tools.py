@@ -0,0 +1,19 @@
+import time
+from datetime import datetime
+
+from google.adk.tools import ToolContext
+
+# Last formatted get_current_datetime result, as (epoch second, text). Replaced as a whole so
+# concurrent callers never see a second paired with another second's text.
+_last_datetime = (0, "")
+
+def get_current_datetime(tool_context: ToolContext) -> str:
+    """Returns the current date and time."""
+    global _last_datetime
+    now = int(time.time())
+    last = _last_datetime
+    if last[0] != now:
+        # Formatted at most once per second; repeated calls within a turn reuse the text.
+        last = (now, f"Current date and time is {datetime.now():%Y-%m-%d %H:%M:%S}.")
+        _last_datetime = last
+    return last[1]
@@ -1,22 +1,77 @@
+import asyncio
 import json
+import math
+import mmap
 import os
-from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
 
-DATA_DIR = "/usr/local/google/home/sanjitmehta/work/cred-all/data"
+try:
+    import orjson
+    _loads = orjson.loads
+    # Files at least this large are parsed straight from a read-only memory map.
+    _MMAP_MIN_BYTES = 1 << 20
+except ImportError:
+    _loads = json.loads
+    _MMAP_MIN_BYTES = None  # stdlib json cannot parse from a memoryview
+
+DATA_DIR = Path(os.getenv("FINTEXT_DATA_DIR") or "/usr/local/google/home/sanjitmehta/work/cred-all/data")
+FD_RATES_PATH = DATA_DIR / "common" / "fd_rates.json"
+RD_RATES_PATH = DATA_DIR / "common" / "rd_rates.json"
+
+# Per-user data files, by the attribute name they get in user_paths().
+_USER_FILE_NAMES = {
+    "profile": "profile.json",
+    "bank_accounts": "bank_accounts.json",
+    "bank_txns": "bank_account_transactions.json",
+    "mutual_funds": "user_mutual_funds.json",
+    "mutual_fund_txns": "user_mutual_fund_transactions.json",
+    "sip_plans": "user_sip.json",
+    "credit_cards": "user_credit_cards.json",
+    "credit_card_payments": "user_credit_card_payments.json",
+    "credit_card_txns": "credit_card_transactions.json",
+    "stocks": "user_stocks.json",
+    "stock_txns": "user_stock_transactions.json",
+}
+
+@lru_cache(maxsize=1024)
+def user_paths(user_id):
+    """Returns the user's data directory (`dir`) and data file paths, built once per user."""
+    user_dir = DATA_DIR / user_id
+    return SimpleNamespace(dir=user_dir, **{attr: user_dir / name for attr, name in _USER_FILE_NAMES.items()})
 
 def get_user_data_dir(user_id):
-    return os.path.join(DATA_DIR, user_id)
+    return user_paths(user_id).dir
 
 def validate_user_id(user_id):
-    return os.path.exists(get_user_data_dir(user_id))
+    return user_paths(user_id).dir.is_dir()
 
 def read_json_file(file_path):
-    if not os.path.exists(file_path):
+    """
+    Reads and parses a JSON file. Parsed data is cached per file version (mtime),
+    so repeated reads within a request are free. Callers must treat the result as read-only.
+    """
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except OSError:
         # print(f"DEBUG: File not found: {file_path}")
         return None
+    return _load(file_path, mtime_ns)
+
+@lru_cache(maxsize=128)
+def _load(file_path, mtime_ns):
     try:
-        with open(file_path, "r") as f:
-            return json.load(f)
+        with open(file_path, "rb") as f:
+            if _MMAP_MIN_BYTES is None or os.fstat(f.fileno()).st_size < _MMAP_MIN_BYTES:
+                return _loads(f.read())
+            # Skips copying large files into a bytes object before parsing.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return _loads(view)
     except json.JSONDecodeError as e:
         print(f"ERROR: Failed to decode JSON from {file_path}: {e}")
         return None
@@ -24,105 +79,288 @@ def read_json_file(file_path):
         print(f"ERROR: Unexpected error reading {file_path}: {e}")
         return None
 
+@dataclass(frozen=True)
+class TransactionTable:
+    """Column-oriented view of a transactions file, built once per file version."""
+    rows: list                   # transactions, in file order
+    dates: list                  # transaction dates, sorted ascending
+    date_strings: list           # the rows' "date" strings, in the order of `dates`
+    order: list                  # row indices, in the order of `dates`
+    row_dates: list              # per-row columns, in file order
+    amounts: array               # integer paise (1/100 rupee)
+    category_index: dict         # value -> row indices, for the categorical columns
+    account_index: dict
+    payment_medium_index: dict
+
+    def window(self, start=None, end=None):
+        """Returns the indices (in file order) of the rows dated within [start, end]."""
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        return sorted(self.order[lo:hi])
+
+    def window_strings(self, start=None, end=None):
+        """
+        Like window(), but with YYYY-MM-DD strings as bounds, compared as text. Partial or malformed
+        bounds (e.g. '2025-01') select what a string comparison would instead of failing to parse.
+        """
+        lo = bisect_left(self.date_strings, start) if start else 0
+        hi = bisect_right(self.date_strings, end) if end else len(self.date_strings)
+        return sorted(self.order[lo:hi])
+
+    def lookup(self, index, values):
+        """Returns the set of row indices whose column value is one of `values`."""
+        return set().union(*(index.get(value, ()) for value in values))
+
+def read_transaction_table(file_path):
+    """
+    Returns the transactions of a JSON file as a TransactionTable.
+    Transaction dates are parsed and sorted once per file version instead of on every call.
+    """
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return TransactionTable([], [], [], [], [], array("q"), {}, {}, {})
+    return _load_transaction_table(file_path, mtime_ns)
+
+@lru_cache(maxsize=32)
+def _load_transaction_table(file_path, mtime_ns):
+    rows = _load(file_path, mtime_ns) or []
+    parsed = [date.fromisoformat(txn["date"]) for txn in rows]
+    order = sorted(range(len(rows)), key=parsed.__getitem__)
+    return TransactionTable(
+        rows,
+        [parsed[i] for i in order],
+        [rows[i]["date"] for i in order],
+        order,
+        parsed,
+        array("q", [round((txn.get("amount") or 0) * 100) for txn in rows]),
+        _build_index(rows, "category"),
+        _build_index(rows, "account_id"),
+        _build_index(rows, "payment_medium"),
+    )
+
+def _build_index(rows, field):
+    index = {}
+    for i, txn in enumerate(rows):
+        index.setdefault(txn.get(field), []).append(i)
+    return index
+
+def invalidate_user(user_id):
+    """Drops cached file data, e.g. after the user's data files were rewritten."""
+    _load.cache_clear()
+    _load_transaction_table.cache_clear()
+    _filter_mutual_fund_transactions.cache_clear()
+    _load_scheme_index.cache_clear()
+    _filter_stock_transactions.cache_clear()
+
+async def read_json_file_async(file_path):
+    """Reads a JSON file in a worker thread so the event loop is not blocked on disk I/O."""
+    return await asyncio.to_thread(read_json_file, file_path)
+
+async def gather_user_files(user_id, names):
+    """Reads several of the user's JSON files concurrently. Returns a dict mapping file name to data."""
+    user_dir = get_user_data_dir(user_id)
+    results = await asyncio.gather(*[read_json_file_async(user_dir / name) for name in names])
+    return dict(zip(names, results))
+
+# Per-user data files read by the sub-agent tools, warmed into the caches on login.
+USER_FILES = (
+    "profile",
+    "bank_accounts",
+    "mutual_funds",
+    "mutual_fund_txns",
+    "sip_plans",
+    "credit_cards",
+    "credit_card_payments",
+    "stocks",
+    "stock_txns",
+)
+TRANSACTION_FILES = ("bank_txns", "credit_card_txns")
+
+def known_user_files(user_id):
+    """Returns the paths of the per-user JSON files the sub-agent tools read."""
+    paths = user_paths(user_id)
+    return [getattr(paths, name) for name in USER_FILES]
+
+async def prefetch_user_files(user_id):
+    """Parses all of the user's data files concurrently, populating the file and transaction caches."""
+    paths = user_paths(user_id)
+    await asyncio.gather(
+        *[read_json_file_async(path) for path in known_user_files(user_id)],
+        *[asyncio.to_thread(read_transaction_table, getattr(paths, name)) for name in TRANSACTION_FILES],
+    )
+
+def user_data_version(user_id):
+    """
+    Returns the latest mtime (ns) across the user's data files and the common rate files.
+    Any change to the data a tool can read moves the version forward.
+    """
+    paths = user_paths(user_id)
+    version = 0
+    for path in [getattr(paths, name) for name in USER_FILES + TRANSACTION_FILES] + [FD_RATES_PATH, RD_RATES_PATH]:
+        try:
+            version = max(version, path.stat().st_mtime_ns)
+        except OSError:
+            pass
+    return version
+
 def get_profile(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "profile.json")
+    path = user_paths(user_id).profile
     return read_json_file(path)
 
 def get_bank_accounts(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "bank_accounts.json")
+    path = user_paths(user_id).bank_accounts
     return read_json_file(path) or []
 
-def get_bank_account_transactions(user_id, start_date=None, end_date=None, categories=None, account_ids=None, min_amount=None, max_amount=None, payment_mediums=None):
-    path = os.path.join(get_user_data_dir(user_id), "bank_account_transactions.json")
-    transactions = read_json_file(path) or []
+def _filter_transactions(table, start_date=None, end_date=None, categories=None, account_ids=None, min_amount=None, max_amount=None, payment_mediums=None):
+    start = date.fromisoformat(start_date) if start_date else None
+    end = date.fromisoformat(end_date) if end_date else None
+    categories = frozenset(categories) if categories else None
+    account_ids = frozenset(account_ids) if account_ids else None
+    payment_mediums = frozenset(payment_mediums) if payment_mediums else None
     
-    filtered_transactions = []
-    for txn in transactions:
-        txn_date = datetime.strptime(txn["date"], "%Y-%m-%d")
-        
-        if start_date and txn_date < datetime.strptime(start_date, "%Y-%m-%d"):
-            continue
-        if end_date and txn_date > datetime.strptime(end_date, "%Y-%m-%d"):
-            continue
-        if categories and txn["category"] not in categories:
-            continue
-        if account_ids and txn["account_id"] not in account_ids:
-            continue
-        if min_amount and txn["amount"] < min_amount:
-            continue
-        if max_amount and txn["amount"] > max_amount:
-            continue
-        if payment_mediums and txn.get("payment_medium") not in payment_mediums:
-            continue
-        
-        filtered_transactions.append(txn)
+    # Categorical filters are answered from the table's inverted indexes, so only
+    # matching rows are visited; the date and amount filters then narrow those rows.
+    selected = None
+    for index, values in ((table.category_index, categories), (table.account_index, account_ids), (table.payment_medium_index, payment_mediums)):
+        if values:
+            matching = table.lookup(index, values)
+            selected = matching if selected is None else selected & matching
     
-    return filtered_transactions
+    if selected is None:
+        indices = table.window(start, end)
+    else:
+        row_dates = table.row_dates
+        indices = [i for i in sorted(selected) if (not start or row_dates[i] >= start) and (not end or row_dates[i] <= end)]
+    if min_amount is not None:
+        column, min_paise = table.amounts, math.ceil(round(min_amount * 100, 6))
+        indices = [i for i in indices if column[i] >= min_paise]
+    if max_amount is not None:
+        column, max_paise = table.amounts, math.floor(round(max_amount * 100, 6))
+        indices = [i for i in indices if column[i] <= max_paise]
+    
+    rows = table.rows
+    return [rows[i] for i in indices]
+
+def get_bank_account_transactions(user_id, start_date=None, end_date=None, categories=None, account_ids=None, min_amount=None, max_amount=None, payment_mediums=None):
+    path = user_paths(user_id).bank_txns
+    return _filter_transactions(read_transaction_table(path), start_date, end_date, categories, account_ids, min_amount, max_amount, payment_mediums)
 
 def get_credit_card_transactions(user_id, start_date=None, end_date=None, categories=None, account_ids=None, min_amount=None, max_amount=None, payment_mediums=None):
-    path = os.path.join(get_user_data_dir(user_id), "credit_card_transactions.json")
-    transactions = read_json_file(path) or []
-    
-    filtered_transactions = []
-    for txn in transactions:
-        txn_date = datetime.strptime(txn["date"], "%Y-%m-%d")
-        
-        if start_date and txn_date < datetime.strptime(start_date, "%Y-%m-%d"):
-            continue
-        if end_date and txn_date > datetime.strptime(end_date, "%Y-%m-%d"):
-            continue
-        if categories and txn["category"] not in categories:
-            continue
-        if account_ids and txn["account_id"] not in account_ids:
-            continue
-        if min_amount and txn["amount"] < min_amount:
-            continue
-        if max_amount and txn["amount"] > max_amount:
-            continue
-        if payment_mediums and txn.get("payment_medium") not in payment_mediums:
-            continue
-        
-        filtered_transactions.append(txn)
-    
-    return filtered_transactions
+    path = user_paths(user_id).credit_card_txns
+    return _filter_transactions(read_transaction_table(path), start_date, end_date, categories, account_ids, min_amount, max_amount, payment_mediums)
 
 def get_mutual_funds(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_mutual_funds.json")
+    path = user_paths(user_id).mutual_funds
     return read_json_file(path) or []
 
-def get_mutual_fund_transactions(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_mutual_fund_transactions.json")
-    return read_json_file(path) or []
+def get_mutual_fund_transactions(user_id, scheme=None, start_date=None, end_date=None):
+    """
+    Returns the user's mutual fund transactions in file order, optionally only those dated within
+    [start_date, end_date] whose scheme name contains `scheme` (case-insensitive).
+    """
+    path = user_paths(user_id).mutual_fund_txns
+    if not (scheme or start_date or end_date):
+        return read_json_file(path) or []
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return []
+    return _filter_mutual_fund_transactions(path, mtime_ns, scheme.lower() if scheme else None, start_date, end_date)
+
+@lru_cache(maxsize=256)
+def _filter_mutual_fund_transactions(path, mtime_ns, scheme, start_date, end_date):
+    # Cached per file version and filter, so the list and summary tools asking for the same
+    # window within a turn share one result. Callers must treat the result as read-only.
+    indices = None
+    if scheme:
+        # Each distinct scheme name is matched once, instead of lowercasing and matching every transaction.
+        indices = sorted(i for name, rows_of in _load_scheme_index(path, mtime_ns).items() if scheme in name for i in rows_of)
+    if start_date or end_date:
+        # The date window is answered from the sorted date column, so only rows inside it are visited.
+        # The bounds come from the model and are compared as strings, so malformed ones cannot raise.
+        window = _load_transaction_table(path, mtime_ns).window_strings(start_date, end_date)
+        if indices is None:
+            indices = window
+        else:
+            in_scheme = set(indices)
+            indices = [i for i in window if i in in_scheme]
+    rows = _load(path, mtime_ns) or []
+    return [rows[i] for i in indices]
+
+@lru_cache(maxsize=32)
+def _load_scheme_index(path, mtime_ns):
+    """Maps each lowercased scheme name of a mutual fund transactions file to its row indices, in file order."""
+    index = {}
+    for i, tx in enumerate(_load(path, mtime_ns) or []):
+        index.setdefault(tx['scheme'].lower(), []).append(i)
+    return index
 
 def get_sip_plans(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_sip.json")
+    path = user_paths(user_id).sip_plans
     return read_json_file(path) or []
 
 def get_credit_cards(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_credit_cards.json")
+    path = user_paths(user_id).credit_cards
     return read_json_file(path) or []
 
-def get_credit_card_payments(user_id, card_id=None):
-    path = os.path.join(get_user_data_dir(user_id), "user_credit_card_payments.json")
+def get_credit_card_payments(user_id, card_id=None, card_ids=None):
+    """Returns the user's credit card payments, optionally only those of `card_id` or of any of `card_ids`."""
+    path = user_paths(user_id).credit_card_payments
     payments = read_json_file(path) or []
     if card_id:
         return [p for p in payments if p["card_id"] == card_id]
+    if card_ids:
+        card_ids = frozenset(card_ids)
+        return [p for p in payments if p["card_id"] in card_ids]
     return payments
 
 def get_stock_holdings(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_stocks.json")
+    path = user_paths(user_id).stocks
     return read_json_file(path) or []
 
-def get_stock_transactions(user_id):
-    path = os.path.join(get_user_data_dir(user_id), "user_stock_transactions.json")
-    return read_json_file(path) or []
+def get_stock_transactions(user_id, symbol=None, transaction_type=None, start_date=None, end_date=None):
+    """
+    Returns the user's stock transactions in file order, optionally only those of `symbol` and
+    `transaction_type` (case-insensitive) dated within [start_date, end_date].
+    """
+    path = user_paths(user_id).stock_txns
+    if not (symbol or transaction_type or start_date or end_date):
+        return read_json_file(path) or []
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return []
+    return _filter_stock_transactions(path, mtime_ns, symbol, transaction_type, start_date, end_date)
+
+@lru_cache(maxsize=256)
+def _filter_stock_transactions(path, mtime_ns, symbol, transaction_type, start_date, end_date):
+    # Cached per file version and filter, so repeated identical fetches within a turn
+    # share one result. Callers must treat the result as read-only.
+    if start_date or end_date:
+        # The date window is answered from the sorted date column, so only rows inside it are visited.
+        # The bounds come from the model and are compared as strings, so malformed ones cannot raise.
+        table = _load_transaction_table(path, mtime_ns)
+        rows = table.rows
+        transactions = [rows[i] for i in table.window_strings(start_date, end_date)]
+    else:
+        transactions = _load(path, mtime_ns) or []
+    if not (symbol or transaction_type):
+        return transactions
+    symbol = symbol.upper() if symbol else None
+    transaction_type = transaction_type.upper() if transaction_type else None
+    return [
+        tx for tx in transactions
+        if (not symbol or tx['symbol'].upper() == symbol)
+        and (not transaction_type or tx['type'].upper() == transaction_type)
+    ]
 
 def get_fd_rates():
     """Returns the current FD interest rates."""
-    path = os.path.join(DATA_DIR, "common", "fd_rates.json")
+    path = FD_RATES_PATH
     return read_json_file(path) or []
 
 def get_rd_rates():
     """Returns the current RD interest rates."""
-    path = os.path.join(DATA_DIR, "common", "rd_rates.json")
+    path = RD_RATES_PATH
     return read_json_file(path) or []
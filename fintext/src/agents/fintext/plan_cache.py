@@ -0,0 +1,188 @@
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from datetime import date
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .dataops import user_data_version
+from .workflow import parse_workflow
+
+# Words that do not change which workflow a query needs ("show my stocks" == "list stocks").
+_FILLER_WORDS = frozenset({
+    "a", "an", "the", "my", "me", "i", "please", "can", "could", "would", "you",
+    "show", "list", "get", "give", "tell", "fetch", "display", "what", "are", "is", "all", "of",
+})
+_WORD = re.compile(r"[a-z0-9]+")
+
+def normalize_query(text):
+    """Lowercases the query, drops punctuation and filler words, and singularizes simple plurals."""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in _FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+class PlanCache:
+    """Bounded LRU mapping of (user_id, day, previous exchange digest or None, normalized query) to a stored workflow plan."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+
+    def get(self, key):
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+        return plan
+
+    def put(self, key, plan):
+        self._plans[key] = plan
+        self._plans.move_to_end(key)
+        if len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+
+plan_cache = PlanCache()
+
+# Words marking a query that refers back to the previous exchange ("yes", "same for credit cards").
+_FOLLOW_UP_WORDS = frozenset({
+    "yes", "no", "yeah", "ok", "okay", "sure", "same", "that", "this", "those", "these", "it", "them",
+    "also", "too", "more", "again", "instead", "else", "other", "another", "previous", "above", "about",
+})
+
+def _plan_cache_key(callback_context: CallbackContext):
+    user_id = callback_context.state.get('user_id')
+    content = callback_context.user_content
+    if not user_id or not content or not content.parts:
+        return None
+    text = " ".join(part.text for part in content.parts if part.text)
+    query = normalize_query(text)
+    if not query:
+        return None
+    # Plans may resolve relative dates ("last month"), so they are only reused on the same day.
+    # A follow-up depends on the previous exchange, so that is part of its key; other queries stand alone.
+    follow_up = not _FOLLOW_UP_WORDS.isdisjoint(_WORD.findall(text.lower()))
+    context = _last_exchange_digest(callback_context) if follow_up else None
+    return (user_id, date.today().isoformat(), context, query)
+
+def _last_exchange_digest(callback_context: CallbackContext):
+    """Returns a digest of the user's message and the final reply of the previous invocation."""
+    current = callback_context.invocation_id
+    previous = None
+    user_text = reply = ""
+    for event in reversed(callback_context.session.events):
+        if event.invocation_id == current:
+            continue
+        if previous is None:
+            previous = event.invocation_id
+        elif event.invocation_id != previous:
+            break
+        if not event.content or not event.content.parts:
+            continue
+        text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+        if not text:
+            continue
+        if event.author == "user":
+            user_text = text
+        elif not reply:
+            reply = text
+    return hashlib.sha256(f"{user_text}\0{reply}".encode()).hexdigest()
+
+def use_cached_plan(callback_context: CallbackContext):
+    """
+    before_agent_callback for the planner.
+    Reuses the stored plan of an equivalent earlier query and skips the planner LLM call.
+    """
+    key = _plan_cache_key(callback_context)
+    if key is None:
+        return None
+    plan = plan_cache.get(key)
+    if plan is None:
+        # Clear the previous turn's plan, so only a plan stored for this query gets cached.
+        callback_context.state['user_query_fulfillment_workflow'] = None
+        return None
+    callback_context.state['user_query_fulfillment_workflow'] = plan
+    # Returning content skips the planner; it is empty, like the planner's own sanitized response.
+    return types.Content(role="model", parts=[])
+
+def remember_plan(callback_context: CallbackContext):
+    """after_agent_callback for the planner. Caches the plan the planner stored for this query."""
+    key = _plan_cache_key(callback_context)
+    plan = callback_context.state.get('user_query_fulfillment_workflow')
+    if key is not None and plan:
+        plan_cache.put(key, plan)
+    return None
+
+# Targets answered from the user's data files alone. The others reach live prices, NAVs, news or
+# search results, which the key does not cover, so plans using them never have their answers reused.
+_FILE_BACKED_TARGETS = frozenset({"banking_agent", "credit_card_agent"})
+# Upper bound on cached answers kept in one session's state.
+MAX_CACHED_RESULTS = 32
+
+def plan_result_key(plan, user_id):
+    """
+    Returns the result cache key of a plan: a hash of the canonical plan JSON, the user,
+    the day and the user's data version. Returns None for plans whose answers must not be reused,
+    i.e. those with a step outside the user's data files.
+    """
+    try:
+        plan = parse_workflow(plan)
+        steps = plan.get("steps") or []
+        if any(step.get("target") not in _FILE_BACKED_TARGETS for step in steps):
+            return None
+        canonical = json.dumps(plan, sort_keys=True, separators=(",", ":"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    material = f"{canonical}|{user_id}|{date.today().isoformat()}|{user_data_version(user_id)}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def use_cached_result(callback_context: CallbackContext):
+    """
+    before_agent_callback for the executor.
+    Returns the final answer of an identical earlier plan over unchanged user data, skipping execution.
+    """
+    state = callback_context.state
+    user_id = state.get('user_id')
+    plan = state.get('user_query_fulfillment_workflow')
+    key = plan_result_key(plan, user_id) if user_id and plan else None
+    state['plan_result_key'] = key
+    state['plan_result_pending'] = None
+    if key is None:
+        return None
+    answer = (state.get('plan_result_cache') or {}).get(key)
+    if answer is None:
+        return None
+    return types.Content(role="model", parts=[types.Part(text=answer)])
+
+def record_result(callback_context: CallbackContext, llm_response: LlmResponse):
+    """
+    after_model_callback for the executor.
+    Tracks the executor's latest text-only response; a later tool call or transfer discards it.
+    """
+    if not callback_context.state.get('plan_result_key') or llm_response.partial:
+        return None
+    parts = (llm_response.content and llm_response.content.parts) or []
+    if any(part.function_call for part in parts):
+        callback_context.state['plan_result_pending'] = None
+    else:
+        text = "".join(part.text for part in parts if part.text and not part.thought)
+        callback_context.state['plan_result_pending'] = text or None
+    return None
+
+def store_result(callback_context: CallbackContext):
+    """after_agent_callback for the executor. Caches the final answer under the plan's result key."""
+    state = callback_context.state
+    key, answer = state.get('plan_result_key'), state.get('plan_result_pending')
+    if key and answer:
+        cache = dict(state.get('plan_result_cache') or {})
+        cache[key] = answer
+        while len(cache) > MAX_CACHED_RESULTS:
+            del cache[next(iter(cache))]
+        state['plan_result_cache'] = cache
+    return None
@@ -1,3 +1,4 @@
+import os
 from typing import List, Optional
 from google.genai import types
 from google.adk.planners.plan_re_act_planner import (
@@ -7,10 +8,14 @@ from google.adk.planners.plan_re_act_planner import (
     ACTION_TAG,
     FINAL_ANSWER_TAG
 )
+from google.adk.planners import BuiltInPlanner
 from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest
 
+# Thoughts are returned in responses only when debugging, as they add output tokens to every turn.
+INCLUDE_THOUGHTS = os.getenv("FINTEXT_DEBUG_THOUGHTS", "0") == "1"
+
 class FinTextPlanner(PlanReActPlanner):
     """
     Custom Planner for FinText Orchestrator.
@@ -117,3 +122,39 @@ class FinTextPlanner(PlanReActPlanner):
         """
 
 
+class AdaptiveThinkingPlanner(BuiltInPlanner):
+    """
+    BuiltInPlanner that lowers the thinking budget for short, narrow requests.
+    Requests up to LIGHT_MAX_CHARS long that mention none of DEEP_KEYWORDS (e.g. "show my latest SIP")
+    get `light_thinking_budget`; all others get the budget of `thinking_config`.
+    """
+
+    LIGHT_MAX_CHARS = 80
+    DEEP_KEYWORDS = ('compare', 'trend', 'across', 'summary')
+
+    def __init__(self, *, thinking_config: types.ThinkingConfig, light_thinking_budget: int = 256):
+        super().__init__(thinking_config=thinking_config)
+        self.light_thinking_config = thinking_config.model_copy(update={'thinking_budget': light_thinking_budget})
+
+    def apply_thinking_config(self, llm_request: LlmRequest) -> None:
+        super().apply_thinking_config(llm_request)
+        message = _last_user_text(llm_request)
+        if message is not None and self._is_light(message):
+            llm_request.config.thinking_config = self.light_thinking_config
+
+    def _is_light(self, message: str) -> bool:
+        if len(message) > self.LIGHT_MAX_CHARS:
+            return False
+        message = message.lower()
+        return not any(keyword in message for keyword in self.DEEP_KEYWORDS)
+
+
+def _last_user_text(llm_request: LlmRequest) -> Optional[str]:
+    """Returns the text of the latest user message, skipping function responses. None if there is none."""
+    for content in reversed(llm_request.contents or []):
+        if content.role != 'user' or not content.parts:
+            continue
+        texts = [part.text for part in content.parts if part.text]
+        if texts:
+            return ''.join(texts)
+    return None
@@ -1,9 +1,10 @@
 from google.adk import Agent
 from google.adk.tools import google_search
+from ...common.models import GEMINI_FLASH
 
 google_search_agent = Agent(
     name="google_search_agent",
-    model="gemini-2.5-flash",
+    model=GEMINI_FLASH,
     disallow_transfer_to_peers=True,
     description="An agent that performs Google searches to answer general financial questions.",
     instruction="""
@@ -28,7 +29,7 @@ google_search_agent = Agent(
 
 google_news_agent = Agent(
     name="google_news_agent",
-    model="gemini-2.5-flash",
+    model=GEMINI_FLASH,
     disallow_transfer_to_peers=True,
     description="An agent that performs Google searches to find recent financial news.",
     instruction="""
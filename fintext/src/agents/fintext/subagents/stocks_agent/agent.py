@@ -5,19 +5,14 @@ from google.adk.planners import BuiltInPlanner
 from google.genai import types
 
 from ...dataops import get_stock_holdings, get_stock_transactions
+from ...common.serialization import csv_field, dumps, extract_amount
+from ...common.tools import get_current_datetime
+from ...common.models import GEMINI_FLASH
 
 import json
-from datetime import datetime
-import io
-import csv
+from operator import itemgetter
 
-model = "gemini-2.5-flash"
-
-def get_current_datetime(tool_context: ToolContext):
-    """
-    Returns the current date and time.
-    """
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+model = GEMINI_FLASH
 
 def get_my_stock_holdings(tool_context: ToolContext):
     """
@@ -31,7 +26,9 @@ def get_my_stock_holdings(tool_context: ToolContext):
     holdings = get_stock_holdings(user_id)
     if not holdings:
         return "No stock holdings found."
-    return json.dumps(holdings, indent=2)
+    return dumps(holdings)
+
+_CSV_HEADER = "date,symbol,type,quantity,price,total_amount"
 
 def get_my_stock_transactions(tool_context: ToolContext, symbol: str = None, transaction_type: str = None, start_date: str = None, end_date: str = None):
     """
@@ -47,37 +44,17 @@ def get_my_stock_transactions(tool_context: ToolContext, symbol: str = None, tra
     user_id = tool_context.state.get('user_id')
     if not user_id:
         return "User not logged in."
-    transactions = get_stock_transactions(user_id)
-    if not transactions:
+    filtered = get_stock_transactions(user_id, symbol, transaction_type, start_date, end_date)
+    # Only an empty result needs the full list, to tell no transactions from none matching.
+    if not filtered and not get_stock_transactions(user_id):
         return "No transactions found."
-    
-    filtered = []
+    return "".join(_iter_csv(filtered))
+
+def _iter_csv(transactions):
+    """Yields the CSV lines of the transactions, header first, each ending in \\r\\n as csv.writer's do."""
+    yield _CSV_HEADER + "\r\n"
     for tx in transactions:
-        if symbol and tx['symbol'].upper() != symbol.upper():
-            continue
-        if transaction_type and tx['type'].upper() != transaction_type.upper():
-            continue
-        if start_date and tx['date'] < start_date:
-            continue
-        if end_date and tx['date'] > end_date:
-            continue
-        filtered.append(tx)
-    
-    output = io.StringIO()
-    fieldnames = ['date', 'symbol', 'type', 'quantity', 'price', 'total_amount']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    
-    for tx in filtered:
-        writer.writerow({
-            'date': tx['date'],
-            'symbol': tx['symbol'],
-            'type': tx['type'],
-            'quantity': tx['quantity'],
-            'price': tx['price'],
-            'total_amount': tx['quantity'] * tx['price']
-        })
-    return output.getvalue()
+        yield f"{tx['date']},{csv_field(tx['symbol'])},{csv_field(tx['type'])},{tx['quantity']},{tx['price']},{tx['quantity'] * tx['price']}\r\n"
 
 def get_stock_transaction_summary(tool_context: ToolContext, group_by: str = 'symbol', start_date: str = None, end_date: str = None):
     """
@@ -92,45 +69,45 @@ def get_stock_transaction_summary(tool_context: ToolContext, group_by: str = 'sy
     user_id = tool_context.state.get('user_id')
     if not user_id:
         return "User not logged in."
-    transactions = get_stock_transactions(user_id)
-    if not transactions:
+    transactions = get_stock_transactions(user_id, start_date=start_date, end_date=end_date)
+    if not transactions and not get_stock_transactions(user_id):
         return json.dumps({"error": "No stock transactions found."})
     
-    summary = {}
+    # Groups are numbered in order of first appearance, and their totals kept in aligned
+    # columns indexed by that number, so no per-row bucket is allocated.
+    # Dates are ISO (YYYY-MM-DD), so the month is their first 7 characters.
+    key_of = (lambda tx: tx['date'][:7]) if group_by == 'month' else (lambda tx: tx.get(group_by, 'Unknown'))
+    group_ids = {}
+    amounts, counts, quantities = [], [], []
     for tx in transactions:
-        tx_date = tx['date']
-        if start_date and tx_date < start_date:
-            continue
-        if end_date and tx_date > end_date:
-            continue
-        
-        if group_by == 'month':
-            key = datetime.strptime(tx_date, "%Y-%m-%d").strftime("%Y-%m")
-        else:
-            key = tx.get(group_by, 'Unknown')
-        
-        if key not in summary:
-            summary[key] = {'amount': 0, 'count': 0, 'quantity': 0}
-        
+        key = key_of(tx)
+        group = group_ids.get(key)
+        if group is None:
+            group = group_ids[key] = len(amounts)
+            amounts.append(0)
+            counts.append(0)
+            quantities.append(0)
+        quantity = tx.get('quantity', 0)
         # Amount is price * quantity. If not present, use 0.
-        amount = tx.get('price', 0) * tx.get('quantity', 0)
-        summary[key]['amount'] += amount
-        summary[key]['count'] += 1
-        summary[key]['quantity'] += tx.get('quantity', 0)
+        amounts[group] += tx.get('price', 0) * quantity
+        counts[group] += 1
+        quantities[group] += quantity
     
     # Format output
     result = {
         "title": f"Stock Transaction Summary by {group_by}",
         "groups": []
     }
-    for key, data in sorted(summary.items(), key=lambda x: x[1]['amount'], reverse=True):
+    ranked = [(amounts[group], key, group) for key, group in group_ids.items()]
+    ranked.sort(key=itemgetter(0), reverse=True)
+    for amount, key, group in ranked:
         result["groups"].append({
             "group": key,
-            "amount": data['amount'],
-            "count": data['count'],
-            "quantity": data['quantity']
+            "amount": amount,
+            "count": counts[group],
+            "quantity": quantities[group]
         })
-    return json.dumps(result, indent=2)
+    return dumps(result)
 
 def calculate_portfolio_value(holdings: list[dict], prices: dict):
     """
@@ -143,36 +120,19 @@ def calculate_portfolio_value(holdings: list[dict], prices: dict):
     Returns:
         JSON string with itemized current values and the grand total.
     """
-    total_portfolio_value = 0
-    enriched_holdings = []
+    # Aligned per-holding columns: quantity held, price, and their product.
+    quantities = [sum(lot['quantity'] for lot in item.get('lots', [])) for item in holdings]
+    price_values = [extract_amount(prices.get(item['symbol'])) for item in holdings]
+    values = [q * price for q, price in zip(quantities, price_values)]
     
-    for item in holdings:
-        symbol = item['symbol']
-        # Sum quantity from lots
-        quantity = sum(lot['quantity'] for lot in item.get('lots', []))
-        
-        price_data = prices.get(symbol)
-        if isinstance(price_data, dict):
-            price = price_data.get('amount', 0.0)
-        else:
-            try:
-                price = float(price_data) if price_data is not None else 0.0
-            except (ValueError, TypeError):
-                price = 0.0
-                
-        current_value = quantity * price
-        
-        # Enrich item
-        item['current_price'] = price
-        item['total_current_value'] = current_value
-        
-        enriched_holdings.append(item)
-        total_portfolio_value += current_value
-        
-    return json.dumps({
-        "holdings": enriched_holdings,
-        "total_portfolio_value": total_portfolio_value
-    }, indent=2)
+    # Enriched copies, so the caller's holdings are left unchanged.
+    return dumps({
+        "holdings": [
+            {**item, 'current_price': price, 'total_current_value': current_value}
+            for item, price, current_value in zip(holdings, price_values, values)
+        ],
+        "total_portfolio_value": sum(values)
+    })
 
 stocks_market_data_agent = Agent(
     name="stocks_market_data_agent",
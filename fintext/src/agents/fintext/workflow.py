@@ -0,0 +1,96 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from google.adk.tools import ToolContext
+from pydantic import BaseModel, Field
+
+# Upper bound on sub-agents/tools running at the same time for one workflow level.
+MAX_PARALLEL_STEPS = 4
+
+class PlanStep(BaseModel):
+    step: int = Field(..., description="The step number.")
+    description: str = Field("", description="What the step does.")
+    query: str = Field(..., description="The sub-query sent to the target.")
+    target: Optional[str] = Field(None, description="The agent or tool executing the step.")
+    depends_on: Optional[List[int]] = Field(None, description="Step numbers whose output this step needs.")
+
+class Plan(BaseModel):
+    user_query: str = Field("", description="The user's original query.")
+    steps: List[PlanStep] = Field(default_factory=list, description="The workflow steps, in order.")
+
+def validate_workflow(workflow):
+    """
+    Validates the planner's workflow JSON against the Plan schema.
+    Returns the plan as a plain dict for session state; fields the planner omitted stay absent.
+    Raises pydantic.ValidationError on a malformed plan.
+    """
+    if isinstance(workflow, str):
+        plan = Plan.model_validate_json(workflow)
+    else:
+        plan = Plan.model_validate(workflow)
+    return plan.model_dump(exclude_unset=True)
+
+def parse_workflow(workflow):
+    """Returns the planner's workflow as a dict, parsing it if it was stored as a JSON string."""
+    if isinstance(workflow, str):
+        return json.loads(workflow)
+    return workflow
+
+def step_dependencies(steps):
+    """
+    Maps each step number to the set of step numbers it depends on.
+    A step without a `depends_on` field depends on the previous step, which keeps
+    plans written before `depends_on` existed strictly sequential.
+    """
+    dependencies = {}
+    previous = None
+    for step in steps:
+        number = step["step"]
+        if "depends_on" in step:
+            dependencies[number] = set(step["depends_on"] or [])
+        else:
+            dependencies[number] = {previous} if previous is not None else set()
+        previous = number
+    return dependencies
+
+def workflow_levels(steps):
+    """
+    Groups the workflow steps into levels of a dependency DAG.
+    Every step in a level only depends on steps of earlier levels, so the steps of
+    one level can be executed concurrently.
+    """
+    dependencies = step_dependencies(steps)
+    by_number = {step["step"]: step for step in steps}
+    done = set()
+    levels = []
+    while len(done) < len(by_number):
+        ready = [number for number in by_number if number not in done and dependencies[number] <= done]
+        if not ready:
+            # Cyclic or dangling dependencies: fall back to plan order for the rest.
+            ready = [number for number in by_number if number not in done][:1]
+        levels.append([by_number[number] for number in ready])
+        done.update(ready)
+    return levels
+
+async def run_agent_tools_concurrently(tool_context: ToolContext, calls, max_concurrency=MAX_PARALLEL_STEPS):
+    """
+    Runs (key, agent_tool, request) calls concurrently with asyncio.gather.
+    Concurrency is capped by a semaphore and errors are isolated per call.
+    Returns a dict mapping each key to the tool output, or to an error string.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(agent_tool, request):
+        async with semaphore:
+            return await agent_tool.run_async(args={"request": request}, tool_context=tool_context)
+
+    keys = [key for key, _, _ in calls]
+    results = await asyncio.gather(
+        *[_call(agent_tool, request) for _, agent_tool, request in calls],
+        return_exceptions=True
+    )
+    return {
+        key: f"Error: {result}" if isinstance(result, Exception) else result
+        for key, result in zip(keys, results)
+    }